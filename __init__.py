@@ -8,23 +8,46 @@ Provides interactive 3D preview for Gaussian Splatting PLY files with
 high-quality image output capabilities.
 """
 
+import importlib
+
 # Shared camera params cache - must be at module level for persistence
 CAMERA_PARAMS_BY_KEY = {}
 
-from .gaussian_viewer import GaussianViewerNode, NODE_CLASS_MAPPINGS as VIEWER_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as VIEWER_DISPLAY_MAPPINGS
-from .extrinsics_to_pose import ExtrinsicsToPoseNode, NODE_CLASS_MAPPINGS as POSE_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as POSE_DISPLAY_MAPPINGS
-
-# Combine node mappings from active nodes only (deprecated nodes hidden)
-NODE_CLASS_MAPPINGS = {
-    **VIEWER_MAPPINGS,
-    **POSE_MAPPINGS,
-}
+# Active node modules (deprecated nodes hidden). Submodules pull in torch,
+# numpy and PIL, so they are only imported on first attribute access.
+_NODE_MODULES = (".gaussian_viewer", ".extrinsics_to_pose")
 
-NODE_DISPLAY_NAME_MAPPINGS = {
-    **VIEWER_DISPLAY_MAPPINGS,
-    **POSE_DISPLAY_MAPPINGS,
+# Public names re-exported from submodules, resolved lazily
+_LAZY_EXPORTS = {
+    "GaussianViewerNode": ".gaussian_viewer",
+    "ExtrinsicsToPoseNode": ".extrinsics_to_pose",
 }
 
 WEB_DIRECTORY = "./web"
 
+
+def _load_node_mappings():
+    """Import active node modules and combine their node mappings."""
+    class_mappings = {}
+    display_mappings = {}
+    for module_name in _NODE_MODULES:
+        module = importlib.import_module(module_name, __name__)
+        class_mappings.update(module.NODE_CLASS_MAPPINGS)
+        display_mappings.update(module.NODE_DISPLAY_NAME_MAPPINGS)
+    globals()["NODE_CLASS_MAPPINGS"] = class_mappings
+    globals()["NODE_DISPLAY_NAME_MAPPINGS"] = display_mappings
+
+
+def __getattr__(name):
+    if name in ("NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"):
+        _load_node_mappings()
+        return globals()[name]
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS', 'WEB_DIRECTORY']
@@ -8,90 +8,151 @@ This module provides a global cache for camera parameters that persists
 across Python module reloads and is shared between Preview and Render nodes.
 """
 
+import logging
+import threading
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CameraState(NamedTuple):
+    """
+    Flat view of a camera state dict posted by the viewer.
+
+    Pose fields are None when the dict has no position/target; focal
+    fields are None when fx/fy are missing.
+    """
+    px: Optional[float]
+    py: Optional[float]
+    pz: Optional[float]
+    tx: Optional[float]
+    ty: Optional[float]
+    tz: Optional[float]
+    fx: Optional[float]
+    fy: Optional[float]
+    image_width: Optional[float]
+    image_height: Optional[float]
+
+    @classmethod
+    def from_dict(cls, camera_state):
+        """Build a CameraState from the nested dict format used by the frontend."""
+        position = camera_state.get('position')
+        target = camera_state.get('target')
+        if position and target:
+            px = float(position.get('x', 0))
+            py = float(position.get('y', 0))
+            pz = float(position.get('z', 0))
+            if isinstance(target, dict):
+                tx = float(target.get('x', 0))
+                ty = float(target.get('y', 0))
+                tz = float(target.get('z', 0))
+            else:
+                tx, ty, tz = 0.0, 0.0, 0.0
+        else:
+            px = py = pz = tx = ty = tz = None
+
+        fx = camera_state.get('fx')
+        fy = camera_state.get('fy')
+        if fx is None or fy is None:
+            fx = fy = None
+        else:
+            fx = float(fx)
+            fy = float(fy)
+
+        image_width = camera_state.get('image_width')
+        image_height = camera_state.get('image_height')
+        return cls(
+            px, py, pz, tx, ty, tz, fx, fy,
+            float(image_width) if image_width else None,
+            float(image_height) if image_height else None,
+        )
+
+
 # Global camera parameters cache
 # Key: PLY filename or path
 # Value: Camera state dict with position, target, fx, fy, etc.
 CAMERA_PARAMS_BY_KEY = {}
+# Same keys, flattened CameraState built once at set time
+CAMERA_TUPLES_BY_KEY = {}
 CAMERA_STATE_VERSION = 0
 
+# Guards writes and multi-step reads. Single-key lookups stay lockless since
+# dict.get is atomic under the GIL.
+_lock = threading.RLock()
+
+
+def canonical_camera_key(ply_file, filename=None):
+    """
+    Return the single key a camera state is stored under.
+
+    The frontend echoes back the output-relative ``ply_file`` it was given,
+    so that is the canonical key; ``filename`` is used only when it is missing.
+    """
+    return ply_file or filename
+
 
 def get_camera_state(key):
     """Get camera state for a given PLY key."""
     result = CAMERA_PARAMS_BY_KEY.get(key)
-    print(f"[CameraParams] get_camera_state(key='{key}')")
-    print(f"[CameraParams] Result: {result is not None}")
-    if result:
-        print(f"[CameraParams] Cached position: x={result.get('position', {}).get('x')}, y={result.get('position', {}).get('y')}, z={result.get('position', {}).get('z')}")
-        print(f"[CameraParams] Cached focal: fx={result.get('fx')}, fy={result.get('fy')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("get_camera_state(key=%r) found=%s", key, result is not None)
     return result
 
 
+def get_camera_tuple(key):
+    """Get the flattened CameraState for a given PLY key."""
+    return CAMERA_TUPLES_BY_KEY.get(key)
+
+
 def set_camera_state(key, camera_state):
     """Set camera state for a given PLY key."""
     global CAMERA_STATE_VERSION
     if key and camera_state:
-        print("=" * 80)
-        print("[CameraParams] ===== SET_CAMERA_STATE STARTED =====")
-        print("=" * 80)
-        print(f"[CameraParams] Setting camera state for key: '{key}'")
-        print(f"[CameraParams] Camera state keys: {list(camera_state.keys())}")
-        print(f"[CameraParams] Camera state details:")
-        if 'position' in camera_state:
-            pos = camera_state['position']
-            print(f"  - Position: x={pos.get('x')}, y={pos.get('y')}, z={pos.get('z')}")
-        if 'target' in camera_state:
-            tgt = camera_state['target']
-            if isinstance(tgt, dict):
-                print(f"  - Target: x={tgt.get('x')}, y={tgt.get('y')}, z={tgt.get('z')}")
-            else:
-                print(f"  - Target: {tgt}")
-        if 'fx' in camera_state or 'fy' in camera_state:
-            print(f"  - Focal length: fx={camera_state.get('fx')}, fy={camera_state.get('fy')}")
-        if 'image_width' in camera_state or 'image_height' in camera_state:
-            print(f"  - Image size: {camera_state.get('image_width')}x{camera_state.get('image_height')}")
-        if 'scale' in camera_state:
-            print(f"  - Scale: {camera_state.get('scale')}")
-        if 'scale_compensation' in camera_state:
-            print(f"  - Scale compensation: {camera_state.get('scale_compensation')}")
-        
-        old_version = CAMERA_STATE_VERSION
-        CAMERA_PARAMS_BY_KEY[key] = camera_state
-        CAMERA_STATE_VERSION += 1
-        
-        print(f"[CameraParams] Camera state saved successfully")
-        print(f"[CameraParams] Version updated: {old_version} -> {CAMERA_STATE_VERSION}")
-        print(f"[CameraParams] Total cached states: {len(CAMERA_PARAMS_BY_KEY)}")
-        print(f"[CameraParams] Cached keys: {list(CAMERA_PARAMS_BY_KEY.keys())}")
-        print("[CameraParams] ===== SET_CAMERA_STATE COMPLETE =====")
-        print("=" * 80)
+        camera_tuple = CameraState.from_dict(camera_state)
+        with _lock:
+            CAMERA_PARAMS_BY_KEY[key] = camera_state
+            CAMERA_TUPLES_BY_KEY[key] = camera_tuple
+            CAMERA_STATE_VERSION += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "set_camera_state(key=%r) position=%s target=%s fx=%s fy=%s version=%d",
+                key,
+                camera_state.get('position'),
+                camera_state.get('target'),
+                camera_state.get('fx'),
+                camera_state.get('fy'),
+                CAMERA_STATE_VERSION,
+            )
     else:
-        print(f"[CameraParams] WARNING: set_camera_state called with key={key}, camera_state={camera_state is not None}")
+        logger.warning("set_camera_state called with key=%r, camera_state=%s", key, camera_state is not None)
 
 
 def clear_camera_state(key=None):
     """Clear camera state for a given key or all keys."""
-    if key is None:
-        key_str = 'None (all)'
-    else:
-        key_str = f"'{key}'"
-    print(f"[CameraParams] clear_camera_state(key={key_str})")
+    global CAMERA_STATE_VERSION
     if key:
-        removed = CAMERA_PARAMS_BY_KEY.pop(key, None)
-        print(f"[CameraParams] Removed state for key '{key}': {removed is not None}")
+        with _lock:
+            removed = CAMERA_PARAMS_BY_KEY.pop(key, None)
+            CAMERA_TUPLES_BY_KEY.pop(key, None)
+            CAMERA_STATE_VERSION += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("clear_camera_state(key=%r) removed=%s", key, removed is not None)
     else:
-        count = len(CAMERA_PARAMS_BY_KEY)
-        CAMERA_PARAMS_BY_KEY.clear()
-        print(f"[CameraParams] Cleared all {count} cached states")
-    print(f"[CameraParams] Remaining cached keys: {list(CAMERA_PARAMS_BY_KEY.keys())}")
+        with _lock:
+            count = len(CAMERA_PARAMS_BY_KEY)
+            CAMERA_PARAMS_BY_KEY.clear()
+            CAMERA_TUPLES_BY_KEY.clear()
+            CAMERA_STATE_VERSION += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("clear_camera_state() cleared %d cached states", count)
 
 
 def list_camera_states():
     """List all cached camera states."""
-    keys = list(CAMERA_PARAMS_BY_KEY.keys())
-    print(f"[CameraParams] list_camera_states() - Found {len(keys)} cached states")
-    for key in keys:
-        state = CAMERA_PARAMS_BY_KEY[key]
-        print(f"[CameraParams]   - '{key}': position={state.get('position')}, fx={state.get('fx')}, fy={state.get('fy')}")
+    with _lock:
+        keys = list(CAMERA_PARAMS_BY_KEY.keys())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("list_camera_states() found %d cached states", len(keys))
     return keys
 
 
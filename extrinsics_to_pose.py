@@ -5,9 +5,16 @@
 Convert camera extrinsics matrix to pose parameters (x, y, z, pitch, yaw, roll).
 """
 
+import json
+import logging
 import math
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+# cos(pitch) below which yaw and roll are degenerate (|sin(pitch)| >= 0.99999)
+_GIMBAL_EPS = math.sqrt(1.0 - 0.99999 ** 2)
+
 
 def rotation_matrix_to_euler(R):
     """
@@ -20,30 +27,31 @@ def rotation_matrix_to_euler(R):
     
     Order: YXZ (yaw, pitch, roll)
     """
-    # Extract rotation matrix elements
-    r00, r01, r02 = R[0][0], R[0][1], R[0][2]
-    r10, r11, r12 = R[1][0], R[1][1], R[1][2]
-    r20, r21, r22 = R[2][0], R[2][1], R[2][2]
+    R = np.asarray(R, dtype=np.float64)
+    
+    # Clamp so asin stays defined for slightly non-orthonormal input
+    s = max(-1.0, min(1.0, -float(R[2, 1])))
+    pitch = math.asin(s)
+    cos_pitch = math.sqrt(1.0 - s * s)
     
     # Check for gimbal lock
-    if abs(r21) < 0.99999:
-        pitch = math.asin(-r21)
-        yaw = math.atan2(r20, r22)
-        roll = math.atan2(r01, r11)
+    if cos_pitch > _GIMBAL_EPS:
+        yaw = math.atan2(R[2, 0], R[2, 2])
+        roll = math.atan2(R[0, 1], R[1, 1])
     else:
         # Gimbal lock case
-        pitch = math.copysign(math.pi / 2, -r21)
-        yaw = math.atan2(-r02, r00)
+        yaw = math.atan2(-R[0, 2], R[0, 0])
         roll = 0.0
     
     # Convert to degrees
-    pitch_deg = math.degrees(pitch)
-    yaw_deg = math.degrees(yaw)
-    roll_deg = math.degrees(roll)
+    pitch_deg, yaw_deg, roll_deg = np.rad2deg((pitch, yaw, roll)).tolist()
     
     return pitch_deg, yaw_deg, roll_deg
 
 
+_POSE_KEYS = ("x", "y", "z", "pitch", "yaw", "roll")
+
+
 class ExtrinsicsToPoseNode:
     """
     Convert a 4x4 camera extrinsics matrix to pose parameters.
@@ -71,38 +79,25 @@ class ExtrinsicsToPoseNode:
         Convert extrinsics matrix to pose parameters.
         """
         if extrinsics is None:
-            print("[ExtrinsicsToPose] ERROR: No extrinsics provided")
+            logger.error("No extrinsics provided")
             return (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, "")
 
-        # Extract position from the 4th column
-        x = float(extrinsics[0][3])
-        y = float(extrinsics[1][3])
-        z = float(extrinsics[2][3])
+        M = np.asarray(extrinsics, dtype=np.float64)
 
-        # Extract 3x3 rotation matrix
-        R = [
-            [extrinsics[0][0], extrinsics[0][1], extrinsics[0][2]],
-            [extrinsics[1][0], extrinsics[1][1], extrinsics[1][2]],
-            [extrinsics[2][0], extrinsics[2][1], extrinsics[2][2]],
-        ]
+        # Extract position from the 4th column
+        x, y, z = M[:3, 3].tolist()
 
-        # Convert rotation to Euler angles
-        pitch, yaw, roll = rotation_matrix_to_euler(R)
+        # Convert the 3x3 rotation block to Euler angles
+        pitch, yaw, roll = rotation_matrix_to_euler(M[:3, :3])
 
         # Round for cleaner output
-        x = round(x, 2)
-        y = round(y, 2)
-        z = round(z, 2)
-        pitch = round(pitch, 2)
-        yaw = round(yaw, 2)
-        roll = round(roll, 2)
-
-        # Create formatted string output
-        pose_string = f'"x":{x},"y":{y},"z":{z},"pitch":{pitch},"yaw":{yaw},"roll":{roll}'
-
-        print(f"[ExtrinsicsToPose] Position: x={x}, y={y}, z={z}")
-        print(f"[ExtrinsicsToPose] Rotation: pitch={pitch}, yaw={yaw}, roll={roll}")
-        print(f"[ExtrinsicsToPose] Pose string: {pose_string}")
+        vals = tuple(round(v, 2) for v in (x, y, z, pitch, yaw, roll))
+        x, y, z, pitch, yaw, roll = vals
+
+        # Create formatted string output: JSON members without the outer braces
+        pose_string = json.dumps(dict(zip(_POSE_KEYS, vals)), separators=(',', ':'))[1:-1]
+
+        logger.debug("Pose: %s", pose_string)
 
         return (x, y, z, pitch, yaw, roll, pose_string)
 
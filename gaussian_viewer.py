@@ -12,84 +12,128 @@ Outputs:
   - intrinsics: 3x3 camera intrinsics matrix (fx, fy, cx, cy)
 """
 
+import functools
+import hashlib
+import itertools
+import logging
+import math
 import os
-import uuid
+
 import numpy as np
-import torch
-from PIL import Image
 
-from .render_gaussian import RenderGaussianNode, COMFYUI_OUTPUT_FOLDER, get_comfy_output_file_info
-from .camera_params import get_camera_state
+logger = logging.getLogger(__name__)
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Process-local fallback for overlay names when the content can't be hashed
+_overlay_counter = itertools.count()
+
+from .render_gaussian import (
+    COMFYUI_OUTPUT_FOLDER,
+    RenderGaussianNode,
+    _matrix_cache_key,
+    matrix_to_list,
+    ply_file_meta,
+)
+from .camera_params import (
+    CameraState,
+    canonical_camera_key,
+    get_camera_state_version,
+    get_camera_tuple,
+)
+
+
+def _overlay_digest(array):
+    """
+    Return a short hex digest of an array's shape, dtype and raw bytes for
+    overlay dedupe. Shape is included so e.g. solid-color images of
+    transposed sizes do not share a file.
+    """
+    data = np.ascontiguousarray(array)
+    header = f"{data.shape}|{data.dtype.str}|".encode("ascii")
+    if xxhash is not None:
+        hasher = xxhash.xxh3_64()
+    else:
+        hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(header)
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def _look_at_extrinsics(px, py, pz, tx, ty, tz):
+    """
+    Build a 4x4 camera-to-world matrix looking from position toward target.
+
+    Cached on the exact coordinates since the viewer re-emits bit-identical
+    camera frames repeatedly. Returns a read-only float64 ndarray.
+    """
+    # Compute forward vector (camera looks toward target)
+    fx, fy, fz = tx - px, ty - py, tz - pz
+    forward_norm = math.sqrt(fx * fx + fy * fy + fz * fz)
+    if forward_norm < 1e-8:
+        fx, fy, fz = 0.0, 0.0, -1.0
+    else:
+        inv = 1.0 / forward_norm
+        fx, fy, fz = fx * inv, fy * inv, fz * inv
+
+    # Compute right vector: cross(forward, world_up) assuming Y-up world
+    rx, ry, rz = -fz, 0.0, fx
+    right_norm = math.sqrt(rx * rx + rz * rz)
+    if right_norm < 1e-8:
+        # Forward is parallel to world up, use Z as reference: cross(forward, (0, 0, 1))
+        rx, ry, rz = fy, -fx, 0.0
+        right_norm = math.sqrt(rx * rx + ry * ry)
+    inv = 1.0 / right_norm
+    rx, ry, rz = rx * inv, ry * inv, rz * inv
+
+    # up = cross(right, forward); already unit length since both are
+    # orthogonal unit vectors, so no normalization is needed
+    ux = ry * fz - rz * fy
+    uy = rz * fx - rx * fz
+    uz = rx * fy - ry * fx
+
+    # Convention: columns are right, up, -forward (OpenGL style)
+    extrinsics = np.array((
+        (rx, ux, -fx, px),
+        (ry, uy, -fy, py),
+        (rz, uz, -fz, pz),
+        (0.0, 0.0, 0.0, 1.0),
+    ), dtype=np.float64)
+    # Shared by every cache hit, so callers must not mutate it
+    extrinsics.flags.writeable = False
+    return extrinsics
 
 
 def camera_state_to_extrinsics(camera_state):
     """
     Convert camera state (position, target) to a 4x4 extrinsics matrix.
     
-    Returns a list-of-lists representation of the camera-to-world transform.
+    Accepts a CameraState or the frontend's nested camera state dict.
+    Returns a 4x4 float64 ndarray of the camera-to-world transform.
     The matrix follows OpenGL convention: columns are [right, up, -forward, position].
     """
     if not camera_state:
         return None
+    if isinstance(camera_state, dict):
+        camera_state = CameraState.from_dict(camera_state)
     
-    position = camera_state.get('position')
-    target = camera_state.get('target')
-    
-    if not position or not target:
+    cs = camera_state
+    if cs.px is None:
         return None
     
-    # Extract position
-    px = float(position.get('x', 0))
-    py = float(position.get('y', 0))
-    pz = float(position.get('z', 0))
-    
-    # Extract target
-    if isinstance(target, dict):
-        tx = float(target.get('x', 0))
-        ty = float(target.get('y', 0))
-        tz = float(target.get('z', 0))
-    else:
-        tx, ty, tz = 0, 0, 0
-    
-    # Compute forward vector (camera looks toward target)
-    forward = np.array([tx - px, ty - py, tz - pz])
-    forward_norm = np.linalg.norm(forward)
-    if forward_norm < 1e-8:
-        forward = np.array([0, 0, -1])
-    else:
-        forward = forward / forward_norm
-    
-    # Compute right and up vectors (assuming Y-up world)
-    world_up = np.array([0, 1, 0])
-    right = np.cross(forward, world_up)
-    right_norm = np.linalg.norm(right)
-    if right_norm < 1e-8:
-        # Forward is parallel to world up, use different reference
-        world_up = np.array([0, 0, 1])
-        right = np.cross(forward, world_up)
-        right_norm = np.linalg.norm(right)
-    right = right / right_norm
-    
-    up = np.cross(right, forward)
-    up = up / np.linalg.norm(up)
-    
-    # Build 4x4 camera-to-world matrix
-    # Convention: columns are right, up, -forward (OpenGL style)
-    extrinsics = [
-        [float(right[0]), float(up[0]), float(-forward[0]), float(px)],
-        [float(right[1]), float(up[1]), float(-forward[1]), float(py)],
-        [float(right[2]), float(up[2]), float(-forward[2]), float(pz)],
-        [0.0, 0.0, 0.0, 1.0]
-    ]
-    
-    return extrinsics
+    return _look_at_extrinsics(cs.px, cs.py, cs.pz, cs.tx, cs.ty, cs.tz)
 
 
 def camera_state_to_intrinsics(camera_state):
     """
     Convert camera state (fx, fy, image dimensions) to a 3x3 intrinsics matrix.
     
-    Returns a list-of-lists representation of the camera intrinsics.
+    Accepts a CameraState or the frontend's nested camera state dict.
+    Returns a 3x3 float32 ndarray of the camera intrinsics.
     
     Matrix format:
         [[fx,  0, cx],
@@ -100,27 +144,25 @@ def camera_state_to_intrinsics(camera_state):
     """
     if not camera_state:
         return None
+    if isinstance(camera_state, dict):
+        camera_state = CameraState.from_dict(camera_state)
     
-    fx = camera_state.get('fx')
-    fy = camera_state.get('fy')
-    image_width = camera_state.get('image_width')
-    image_height = camera_state.get('image_height')
-    
-    if fx is None or fy is None:
+    cs = camera_state
+    if cs.fx is None:
         return None
     
-    fx = float(fx)
-    fy = float(fy)
+    fx = cs.fx
+    fy = cs.fy
     
     # Principal point at image center
-    cx = float(image_width) / 2.0 if image_width else fx
-    cy = float(image_height) / 2.0 if image_height else fy
+    cx = cs.image_width / 2.0 if cs.image_width else fx
+    cy = cs.image_height / 2.0 if cs.image_height else fy
     
-    intrinsics = [
-        [fx, 0.0, cx],
-        [0.0, fy, cy],
-        [0.0, 0.0, 1.0]
-    ]
+    intrinsics = np.array((
+        (fx, 0.0, cx),
+        (0.0, fy, cy),
+        (0.0, 0.0, 1.0),
+    ), dtype=np.float32)
     
     return intrinsics
 
@@ -143,6 +185,13 @@ class GaussianViewerNode(RenderGaussianNode):
         - intrinsics: 3x3 camera intrinsics from viewer
     """
 
+    def __init__(self):
+        super().__init__()
+        # Derived camera matrices keyed by camera state key: (version, extrinsics, intrinsics)
+        self._cam_cache = {}
+        # Last successful render: (cache_key, rendered_image)
+        self._render_cache = None
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -179,101 +228,102 @@ class GaussianViewerNode(RenderGaussianNode):
         Preview the PLY in the viewer and return the rendered IMAGE output,
         along with camera extrinsics and intrinsics from the viewer state.
         """
-        print("=" * 80)
-        print("[GaussianViewer] ===== VIEWER NODE EXECUTED =====")
-        print("=" * 80)
-        print("[GaussianViewer] Input parameters:")
-        print(f"  ply_path: {ply_path}")
-        print(f"  extrinsics: {extrinsics is not None}")
-        print(f"  intrinsics: {intrinsics is not None}")
+        logger.debug(
+            "viewer executed: ply_path=%s extrinsics=%s intrinsics=%s",
+            ply_path, extrinsics is not None, intrinsics is not None,
+        )
 
         if not ply_path:
-            print("[GaussianViewer] ERROR: No PLY path provided")
+            logger.error("No PLY path provided")
             placeholder_image = self._create_placeholder_image(2048, 1.0)
             return {"ui": {"error": ["No PLY path provided"]}, "result": (placeholder_image, None, None)}
 
-        if not os.path.exists(ply_path):
-            print(f"[GaussianViewer] ERROR: PLY file not found: {ply_path}")
+        try:
+            st = os.stat(ply_path)
+        except OSError:
+            logger.error("PLY file not found: %s", ply_path)
             placeholder_image = self._create_placeholder_image(2048, 1.0)
             return {"ui": {"error": [f"File not found: {ply_path}"]}, "result": (placeholder_image, None, None)}
 
-        file_info = get_comfy_output_file_info(ply_path)
-        filename = file_info["filename"]
-        relative_path = file_info["relative_path"]
-        subfolder = file_info["subfolder"]
-        file_type = file_info["type"]
-
-        file_size = os.path.getsize(ply_path)
-        file_size_mb = file_size / (1024 * 1024)
-
-        print("[GaussianViewer] File info:")
-        print(f"  Full path: {ply_path}")
-        print(f"  Relative path: {relative_path}")
-        print(f"  Filename: {filename}")
-        print(f"  Subfolder: {subfolder}")
-        print(f"  Type: {file_type}")
-        print(f"  File size: {file_size_mb:.2f} MB ({file_size:,} bytes)")
+        info, file_size_mb = ply_file_meta(ply_path, st.st_mtime_ns, st.st_size)
+        logger.debug("file info: %s size=%.2f MB", info, file_size_mb)
 
         ui_data = {
-            "ply_file": [relative_path],
-            "filename": [filename],
-            "subfolder": [subfolder],
-            "type": [file_type],
+            "ply_file": [info.rel],
+            "filename": [info.base],
+            "subfolder": [info.subfolder],
+            "type": [info.type],
             "file_size_mb": [round(file_size_mb, 2)],
         }
 
         if extrinsics is not None:
-            ui_data["extrinsics"] = [extrinsics]
-            print(f"[GaussianViewer] Extrinsics provided: {len(extrinsics)}x{len(extrinsics[0])}")
+            ui_data["extrinsics"] = [matrix_to_list(extrinsics)]
         if intrinsics is not None:
-            ui_data["intrinsics"] = [intrinsics]
-            print(f"[GaussianViewer] Intrinsics provided: {len(intrinsics)}x{len(intrinsics[0])}")
+            ui_data["intrinsics"] = [matrix_to_list(intrinsics)]
 
         if image is not None:
-            print(f"[GaussianViewer] Reference image provided: {image.shape}")
             try:
                 # Save the first image in the batch as an overlay
-                img_tensor = image[0]
-                i = 255. * img_tensor.cpu().numpy()
-                img = Image.fromarray(np.uint8(i))
+                import torch
+                from PIL import Image
 
-                overlay_filename = f"gaussian_overlay_{uuid.uuid4().hex}.png"
+                img_tensor = image[0]
+                # Scale and cast on the tensor's device so only uint8 data is copied to host.
+                # Elementwise ops keep a strided input's layout, so make the uint8
+                # result contiguous (no-op if it already is) rather than the float input.
+                img_np = img_tensor.mul(255.0).clamp_(0, 255).to(torch.uint8).contiguous().cpu().numpy()
+
+                # Content-addressed filename: identical overlays reuse the prior file
+                try:
+                    overlay_id = _overlay_digest(img_np)
+                    hashed = True
+                except (TypeError, ValueError, BufferError):
+                    overlay_id = next(_overlay_counter)
+                    hashed = False
+                overlay_filename = f"gaussian_overlay_{overlay_id}.png"
                 overlay_path = os.path.join(COMFYUI_OUTPUT_FOLDER, overlay_filename)
-                img.save(overlay_path)
+                # Counter names restart per process, so only hashed names may be reused
+                if not (hashed and os.path.exists(overlay_path)):
+                    img = Image.fromarray(img_np)
+                    img.save(overlay_path, format='PNG', compress_level=1, optimize=False)
+                    logger.debug("Overlay image saved: %s", overlay_filename)
+                else:
+                    logger.debug("Overlay image reused: %s", overlay_filename)
 
                 ui_data["overlay_image"] = [overlay_filename]
-                print(f"[GaussianViewer] Overlay image saved: {overlay_filename}")
             except Exception as e:
-                print(f"[GaussianViewer] ERROR saving overlay image: {e}")
-
-        print(f"[GaussianViewer] UI data keys: {list(ui_data.keys())}")
-        print("[GaussianViewer] ===== VIEWER PREVIEW READY =====")
-        print("=" * 80)
-
-        # Render the image
-        image_tuple = super().render_gaussian(ply_path, extrinsics, intrinsics, node_id=node_id)
-        rendered_image = image_tuple[0]
-
-        # Look up camera state and convert to extrinsics/intrinsics
-        camera_state = None
-        for key in (ply_path, relative_path, filename):
-            camera_state = get_camera_state(key)
-            if camera_state:
-                print(f"[GaussianViewer] Found camera state for key: {key}")
-                break
-
-        output_extrinsics = camera_state_to_extrinsics(camera_state)
-        output_intrinsics = camera_state_to_intrinsics(camera_state)
-
-        if output_extrinsics:
-            print(f"[GaussianViewer] Output extrinsics: 4x4 matrix")
+                logger.error("Failed to save overlay image: %s", e)
+
+        # Render the image, reusing the last result if nothing it depends on changed.
+        # Only valid with a saved camera state: without one the frontend renders
+        # its live view and crop, which the cache key cannot see.
+        has_camera_state = self._lookup_camera_state(info) is not None
+        cache_key = (
+            ply_path,
+            st.st_mtime_ns,
+            _matrix_cache_key(extrinsics),
+            _matrix_cache_key(intrinsics),
+            get_camera_state_version(),
+        )
+        if has_camera_state and self._render_cache is not None and self._render_cache[0] == cache_key:
+            rendered_image = self._render_cache[1]
+            logger.debug("Reusing cached render (inputs and camera unchanged)")
         else:
-            print("[GaussianViewer] Output extrinsics: None (no camera state)")
+            rendered_image, ok = self._render_image(ply_path, extrinsics, intrinsics, node_id=node_id)
+            self._render_cache = (cache_key, rendered_image) if ok and has_camera_state else None
 
-        if output_intrinsics:
-            print(f"[GaussianViewer] Output intrinsics: 3x3 matrix")
+        # Look up camera state and convert to extrinsics/intrinsics
+        camera_key = canonical_camera_key(info.rel, info.base)
+        camera_version = get_camera_state_version()
+        cached = self._cam_cache.get(camera_key)
+        if cached is not None and cached[0] == camera_version:
+            _, output_extrinsics, output_intrinsics = cached
         else:
-            print("[GaussianViewer] Output intrinsics: None (no camera state)")
+            camera_tuple = get_camera_tuple(camera_key)
+            output_extrinsics = camera_state_to_extrinsics(camera_tuple)
+            output_intrinsics = camera_state_to_intrinsics(camera_tuple)
+            self._cam_cache[camera_key] = (camera_version, output_extrinsics, output_intrinsics)
+        logger.debug("camera key %r: output matrices=%s", camera_key, output_extrinsics is not None)
 
         return {"ui": ui_data, "result": (rendered_image, output_extrinsics, output_intrinsics)}
 
@@ -9,16 +9,23 @@ executes rendering, and outputs IMAGE to downstream nodes.
 """
 
 import base64
+import binascii
+import concurrent.futures
+import functools
+import itertools
+import logging
 import os
-import uuid
+import secrets
+from dataclasses import dataclass
 from io import BytesIO
 
-import hashlib
-import json
+import threading
 import time
-import numpy as np
-import torch
-from PIL import Image
+
+# numpy, torch, PIL and torchvision are imported where they are used so that
+# loading this module at ComfyUI startup does not pay for them.
+
+logger = logging.getLogger(__name__)
 
 try:
     import folder_paths
@@ -26,15 +33,51 @@ try:
 except (ImportError, AttributeError):
     COMFYUI_OUTPUT_FOLDER = None
 
+# Normalized output root with a trailing separator, for prefix checks
+_OUTPUT_ROOT_PREFIX = None
+if COMFYUI_OUTPUT_FOLDER:
+    _OUTPUT_ROOT_PREFIX = os.path.normcase(os.path.abspath(COMFYUI_OUTPUT_FOLDER))
+    if not _OUTPUT_ROOT_PREFIX.endswith(os.sep):
+        _OUTPUT_ROOT_PREFIX += os.sep
+
 # Import shared camera params cache
 from .camera_params import (
     CAMERA_PARAMS_BY_KEY,
+    canonical_camera_key,
     get_camera_state,
     get_camera_state_version,
     set_camera_state,
 )
 
 
+# Opt-in: return rendered IMAGE tensors on the GPU, normalizing there so only
+# uint8 data crosses PCIe. Off by default to keep ComfyUI's CPU IMAGE convention.
+RENDER_OUTPUT_ON_GPU = os.environ.get("GAUSSIAN_VIEWER_GPU_OUTPUT", "").lower() in ("1", "true", "yes")
+
+# In-flight renders keyed on (ply_path, camera_version, extrinsics, intrinsics);
+# concurrent identical requests share the owner's Future
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Request IDs only need to be unique within this process
+_REQ_COUNTER = itertools.count()
+_PID = os.getpid()
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_JPEG_MAGIC = b"\xff\xd8\xff"
+
+# Background pool for writing output images off the render path
+_SAVE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="gaussian-save")
+_SAVE_PENDING_MAX = 8
+_SAVE_SLOTS = threading.BoundedSemaphore(_SAVE_PENDING_MAX)
+
+# Seconds to wait for the frontend to post a render result
+_RENDER_TIMEOUT = 30
+# Coalesced callers wait on the owner, whose budget is the frontend wait plus
+# send and decode time, so they get extra headroom beyond _RENDER_TIMEOUT
+_JOIN_TIMEOUT = _RENDER_TIMEOUT + 30
+
+
 def get_comfy_output_file_info(path: str):
     """Return Comfy /view-compatible file info for a path in the output folder."""
     filename = os.path.basename(path) if path else ""
@@ -49,12 +92,10 @@ def get_comfy_output_file_info(path: str):
         return info
 
     try:
-        output_root = os.path.abspath(COMFYUI_OUTPUT_FOLDER)
         absolute_path = os.path.abspath(path)
-        output_root_norm = os.path.normcase(output_root)
-        absolute_path_norm = os.path.normcase(absolute_path)
-        if os.path.commonpath([output_root_norm, absolute_path_norm]) == output_root_norm:
-            relative_path = os.path.relpath(absolute_path, output_root)
+        # The prefix match already proves containment, so slice instead of relpath()
+        if os.path.normcase(absolute_path).startswith(_OUTPUT_ROOT_PREFIX):
+            relative_path = absolute_path[len(_OUTPUT_ROOT_PREFIX):]
             relative_parts = relative_path.split(os.sep)
             info["filename"] = relative_parts[-1]
             info["subfolder"] = "/".join(relative_parts[:-1])
@@ -65,6 +106,170 @@ def get_comfy_output_file_info(path: str):
     return info
 
 
+@dataclass(frozen=True)
+class PlyPathInfo:
+    """Path-derived names for a PLY, computed once per request."""
+    full: str       # path as given to the node
+    base: str       # filename (last component of rel)
+    stem: str       # basename without extension, used for output names
+    rel: str        # output-relative path with '/' separators, or the filename
+    subfolder: str  # /view subfolder
+    type: str       # /view type
+
+
+def _ply_info(ply_path: str) -> PlyPathInfo:
+    """Build the PlyPathInfo for a PLY path."""
+    file_info = get_comfy_output_file_info(ply_path)
+    return PlyPathInfo(
+        full=ply_path,
+        base=file_info["filename"],
+        stem=os.path.splitext(os.path.basename(ply_path))[0],
+        rel=file_info["relative_path"],
+        subfolder=file_info["subfolder"],
+        type=file_info["type"],
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def ply_file_meta(ply_path, mtime_ns, size):
+    """
+    Return (PlyPathInfo, file_size_mb) for a PLY.
+
+    Shared by the render and viewer nodes. mtime_ns and size (from one
+    os.stat) are part of the cache key so a rewritten file invalidates
+    its entry.
+    """
+    return _ply_info(ply_path), size / (1024 * 1024)
+
+
+def _output_device():
+    """Return the device IMAGE outputs live on: "cuda" with RENDER_OUTPUT_ON_GPU and CUDA, else "cpu"."""
+    import torch
+    if RENDER_OUTPUT_ON_GPU and torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+@functools.lru_cache(maxsize=8)
+def _zero_image(height: int, width: int):
+    """Return a shared black (1, H, W, 3) float32 CPU image. Do not mutate."""
+    import torch
+    return torch.zeros((1, height, width, 3), dtype=torch.float32)
+
+
+@functools.lru_cache(maxsize=1)
+def _torchvision_decoder():
+    """Return (decode_image, ImageReadMode) from torchvision, or None if unavailable."""
+    try:
+        from torchvision.io import ImageReadMode, decode_image
+    except ImportError:
+        return None
+    return decode_image, ImageReadMode
+
+
+# Render results/errors posted by the frontend, shared by all node instances.
+# Guarded by _RENDER_LOCK since the aiohttp handlers and node execution run
+# on different threads.
+_RENDER_RESULTS = {}
+_RENDER_RESULTS_META = {}
+_RENDER_RESULTS_QUEUE = []
+_RENDER_ERRORS = {}
+_RENDER_ERRORS_META = {}
+_RENDER_ERRORS_QUEUE = []
+# request_id -> threading.Event for the render call waiting on it
+_RENDER_EVENTS = {}
+_RENDER_RESULTS_MAX = 200
+_RENDER_RESULTS_TTL = 300  # seconds
+_RENDER_LOCK = threading.Lock()
+
+
+_B64_CHUNK = 1 << 20  # characters per decode step; multiple of 4
+
+
+def _b64_decode_into(data, start=0):
+    """
+    Decode a base64 str/bytes payload into a preallocated bytearray.
+
+    Decoding begins at ``start`` (e.g. past a data-URL prefix) and proceeds
+    in _B64_CHUNK slices of the original payload, so peak transient memory
+    stays near the output size instead of doubling. Payloads that are not
+    plain padded base64 (e.g. contain line breaks) fall back to
+    base64.b64decode.
+    """
+    end = len(data)
+    n = end - start
+    if n % 4:
+        return bytearray(base64.b64decode(data[start:]))
+    padding = 0
+    if n and data[-1] in ("=", 61):
+        padding = 2 if data[-2] in ("=", 61) else 1
+    out = bytearray(n // 4 * 3 - padding)
+    view = memoryview(out)
+    pos = 0
+    try:
+        for offset in range(start, end, _B64_CHUNK):
+            chunk = binascii.a2b_base64(data[offset:offset + _B64_CHUNK])
+            view[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+    except (binascii.Error, ValueError):
+        return bytearray(base64.b64decode(data[start:]))
+    finally:
+        view.release()
+    if pos != len(out):
+        return bytearray(base64.b64decode(data[start:]))
+    return out
+
+
+def _remove_queued(queue, request_id):
+    try:
+        queue.remove(request_id)
+    except ValueError:
+        pass
+
+
+def _prune_render_results_locked():
+    """Evict old render results by TTL and max size. Caller holds _RENDER_LOCK."""
+    now = time.time()
+
+    # TTL eviction
+    for results, meta, queue in (
+        (_RENDER_RESULTS, _RENDER_RESULTS_META, _RENDER_RESULTS_QUEUE),
+        (_RENDER_ERRORS, _RENDER_ERRORS_META, _RENDER_ERRORS_QUEUE),
+    ):
+        expired = [key for key, ts in meta.items() if now - ts > _RENDER_RESULTS_TTL]
+        for key in expired:
+            results.pop(key, None)
+            meta.pop(key, None)
+            _remove_queued(queue, key)
+
+        # Size-based eviction (FIFO)
+        while len(queue) > _RENDER_RESULTS_MAX:
+            oldest = queue.pop(0)
+            results.pop(oldest, None)
+            meta.pop(oldest, None)
+
+
+def _matrix_cache_key(matrix):
+    """
+    Return a hashable, content-based key for an optional camera matrix.
+
+    ndarrays are keyed by their raw bytes since repr() rounds to about 8
+    significant digits; lists keep repr(), which is exact for Python floats.
+    """
+    if matrix is None:
+        return None
+    if hasattr(matrix, "tobytes"):
+        return (matrix.shape, matrix.dtype.str, matrix.tobytes())
+    return repr(matrix)
+
+
+def matrix_to_list(matrix):
+    """Return a JSON-serializable nested list for an ndarray or list matrix."""
+    if hasattr(matrix, "tolist"):
+        return matrix.tolist()
+    return matrix
+
+
 class RenderGaussianNode:
     """
     Render Gaussian Splatting PLY files.
@@ -73,25 +278,6 @@ class RenderGaussianNode:
     and outputs IMAGE to downstream nodes.
     """
 
-    def __init__(self):
-        # Use class-level storage to share between node instances and JavaScript
-        if not hasattr(RenderGaussianNode, "render_results"):
-            RenderGaussianNode.render_results = {}
-        if not hasattr(RenderGaussianNode, "render_results_meta"):
-            RenderGaussianNode.render_results_meta = {}
-        if not hasattr(RenderGaussianNode, "render_results_queue"):
-            RenderGaussianNode.render_results_queue = []
-        if not hasattr(RenderGaussianNode, "render_errors"):
-            RenderGaussianNode.render_errors = {}
-        if not hasattr(RenderGaussianNode, "render_errors_meta"):
-            RenderGaussianNode.render_errors_meta = {}
-        if not hasattr(RenderGaussianNode, "render_errors_queue"):
-            RenderGaussianNode.render_errors_queue = []
-        if not hasattr(RenderGaussianNode, "render_results_max"):
-            RenderGaussianNode.render_results_max = 200
-        if not hasattr(RenderGaussianNode, "render_results_ttl"):
-            RenderGaussianNode.render_results_ttl = 300  # seconds
-
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -126,291 +312,258 @@ class RenderGaussianNode:
         """
         camera_state = _lookup_camera_state_for_change(ply_path)
         camera_version = get_camera_state_version()
-        payload = {
-            "ply_path": ply_path,
-            "camera_state": camera_state,
-            "camera_version": camera_version,
-            "extrinsics": extrinsics,
-            "intrinsics": intrinsics,
-        }
-        data = json.dumps(payload, sort_keys=True, ensure_ascii=True, default=str)
-        print(f"[RenderGaussian] IS_CHANGED: camera_version={camera_version}, camera_state={'yes' if camera_state else 'no'}")
-        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+        logger.debug("IS_CHANGED: camera_version=%s camera_state=%s", camera_version, camera_state is not None)
+        # camera_version bumps on every set_camera_state, so it stands in for
+        # hashing the camera state contents. Matrices are hashed by content:
+        # ndarray repr() drops precision and would hide small camera changes.
+        return (
+            f"{ply_path}|{camera_version}|{id(camera_state) if camera_state else 0}"
+            f"|{hash(_matrix_cache_key(extrinsics)) if extrinsics is not None else 0}"
+            f"|{hash(_matrix_cache_key(intrinsics)) if intrinsics is not None else 0}"
+        )
 
     def render_gaussian(self, ply_path: str, extrinsics=None, intrinsics=None, node_id=None):
         """
         Execute rendering and return image tensor.
         """
-        import time
+        image, _ = self._render_image(ply_path, extrinsics, intrinsics, node_id=node_id)
+        return (image,)
+
+    def _render_image(self, ply_path: str, extrinsics=None, intrinsics=None, node_id=None):
+        """
+        Render through the frontend and return (image_tensor, ok).
+
+        ``ok`` is True only when a real frontend render was converted;
+        otherwise the tensor is a placeholder. Always returns a freshly
+        allocated tensor: ComfyUI treats node outputs as immutable and may
+        cache or hold them, so they are never reused as output buffers.
+        """
         start_time = time.time()
-        print("=" * 80)
-        print(f"[RenderGaussian] ===== RENDER REQUEST STARTED =====")
-        print("=" * 80)
+        logger.debug(
+            "render start: ply_path=%s extrinsics=%s intrinsics=%s",
+            ply_path, extrinsics is not None, intrinsics is not None,
+        )
         
         # 1. Validate input parameters
-        print(f"[RenderGaussian] Input parameters:")
-        print(f"  ply_path: {ply_path}")
-        print(f"  extrinsics: {extrinsics is not None}")
-        print(f"  intrinsics: {intrinsics is not None}")
-        
         if not ply_path:
-            print("[RenderGaussian] ERROR: No PLY path provided")
-            image = self._create_placeholder_image(2048, 1.0)
-            print(f"[RenderGaussian] Created placeholder image: {image.shape}")
-            return (image,)
-
-        if not os.path.exists(ply_path):
-            print(f"[RenderGaussian] ERROR: PLY file not found: {ply_path}")
-            image = self._create_placeholder_image(2048, 1.0)
-            print(f"[RenderGaussian] Created placeholder image: {image.shape}")
-            return (image,)
-
-        file_info = get_comfy_output_file_info(ply_path)
-        filename = file_info["filename"]
-        relative_path = file_info["relative_path"]
-        subfolder = file_info["subfolder"]
-        file_type = file_info["type"]
-        
-        print(f"[RenderGaussian] File info:")
-        print(f"  Full path: {ply_path}")
-        print(f"  Relative path: {relative_path}")
-        print(f"  Filename: {filename}")
-        print(f"  Subfolder: {subfolder}")
-        print(f"  Type: {file_type}")
+            logger.error("No PLY path provided")
+            return self._create_placeholder_image(2048, 1.0), False
+
+        try:
+            st = os.stat(ply_path)
+        except OSError:
+            logger.error("PLY file not found: %s", ply_path)
+            return self._create_placeholder_image(2048, 1.0), False
+
+        info, _ = ply_file_meta(ply_path, st.st_mtime_ns, st.st_size)
+        logger.debug("file info: %s", info)
 
         # 2. Generate unique request ID
         request_id = self._generate_request_id()
-        print(f"[RenderGaussian] Generated request ID: {request_id}")
 
         # Look up camera state
-        camera_state = self._lookup_camera_state(ply_path, relative_path, filename)
-        print(f"[RenderGaussian] Camera state lookup:")
-        print(f"  Found camera_state: {camera_state is not None}")
-        if camera_state:
-            print(f"  Camera state keys: {list(camera_state.keys())}")
-            print(f"  Position: {camera_state.get('position')}")
-            print(f"  Target: {camera_state.get('target')}")
-            print(f"  Image size: {camera_state.get('image_width')}x{camera_state.get('image_height')}")
-            print(f"  Focal length: fx={camera_state.get('fx')}, fy={camera_state.get('fy')}")
-            print(f"  Scale: {camera_state.get('scale')}")
-            print(f"  Scale compensation: {camera_state.get('scale_compensation')}")
+        camera_state = self._lookup_camera_state(info)
+        if camera_state and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "camera state: position=%s target=%s size=%sx%s fx=%s fy=%s",
+                camera_state.get('position'), camera_state.get('target'),
+                camera_state.get('image_width'), camera_state.get('image_height'),
+                camera_state.get('fx'), camera_state.get('fy'),
+            )
 
         # Calculate aspect ratio and resolution
         aspect = self._get_aspect_ratio(intrinsics, camera_state)
         output_resolution = self._compute_output_resolution(aspect)
-        print(f"[RenderGaussian] Rendering parameters:")
-        print(f"  Aspect ratio: {aspect:.4f}")
-        print(f"  Output resolution: {output_resolution}")
-        print(f"  Output aspect ratio: source")
-
-        # 3. Send RENDER_REQUEST to iframe (via UI data)
-        ui_data = {
-            "render_request": [True],
-            "request_id": [request_id],
-            "ply_file": [relative_path],  # Use ply_file like Preview node
-            "filename": [filename],
-            "subfolder": [subfolder],
-            "type": [file_type],
-            "output_resolution": [output_resolution],
-            "output_aspect_ratio": ["source"],
+        logger.debug(
+            "request %s: camera_state=%s aspect=%.4f output_resolution=%s",
+            request_id, camera_state is not None, aspect, output_resolution,
+        )
+
+        # 3. Build RENDER_REQUEST payload for the iframe
+        payload = {
+            "ply_file": info.rel,  # Use ply_file like Preview node
+            "filename": info.base,
+            "subfolder": info.subfolder,
+            "type": info.type,
+            "output_resolution": output_resolution,
+            "output_aspect_ratio": "source",
+            "extrinsics": matrix_to_list(extrinsics) if extrinsics is not None else None,
+            "intrinsics": matrix_to_list(intrinsics) if intrinsics is not None else None,
+            "camera_state": camera_state,
         }
 
-        if extrinsics is not None:
-            ui_data["extrinsics"] = [extrinsics]
-            print(f"[RenderGaussian] Extrinsics shape: {len(extrinsics)}x{len(extrinsics[0])}")
-        if intrinsics is not None:
-            ui_data["intrinsics"] = [intrinsics]
-            print(f"[RenderGaussian] Intrinsics shape: {len(intrinsics)}x{len(intrinsics[0])}")
-        if camera_state is not None:
-            ui_data["camera_state"] = [camera_state]
+        # Coalesce identical concurrent renders: later callers wait on the first.
+        # Without a saved camera state each node's iframe renders its own live
+        # view, so such renders are only shared within the same node.
+        coalesce_key = (
+            ply_path,
+            get_camera_state_version(),
+            _matrix_cache_key(extrinsics),
+            _matrix_cache_key(intrinsics),
+            node_id if camera_state is None else None,
+        )
+        with _INFLIGHT_LOCK:
+            future = _INFLIGHT.get(coalesce_key)
+            is_owner = future is None
+            if is_owner:
+                future = concurrent.futures.Future()
+                _INFLIGHT[coalesce_key] = future
+
+        if is_owner:
+            image_tensor = None
+            try:
+                image_tensor = self._request_frontend_render(request_id, payload, info, node_id, start_time)
+            finally:
+                with _INFLIGHT_LOCK:
+                    _INFLIGHT.pop(coalesce_key, None)
+                future.set_result(image_tensor)
+        else:
+            logger.debug("request %s: joining in-flight render for %s", request_id, ply_path)
+            try:
+                image_tensor = future.result(timeout=_JOIN_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                logger.error("Timed out waiting for in-flight render of %s", ply_path)
+                image_tensor = None
+
+        if image_tensor is None:
+            return self._create_placeholder_image(output_resolution, aspect), False
 
-        print(f"[RenderGaussian] Sending render request to frontend...")
-        print(f"[RenderGaussian] Waiting for render result (timeout: 30s)...")
+        return image_tensor, True
 
+    def _request_frontend_render(self, request_id, payload, info, node_id, start_time):
+        """
+        Send a render request, wait for the frontend result and convert it.
+
+        Returns the image tensor, or None if the render failed.
+        """
         # Send render request to frontend immediately (do not wait for onExecuted)
         send_start = time.time()
-        self._send_render_request(request_id, ui_data, node_id=node_id)
+        self._send_render_request(request_id, payload, node_id=node_id)
         send_end = time.time()
-        print(f"[RenderGaussian] Render request sent in {send_end - send_start:.3f}s")
 
         # 4. Wait for render result from iframe
         wait_start = time.time()
         try:
-            base64_image = self._wait_for_render_result(request_id, timeout=30)
+            render_result = self._wait_for_render_result(request_id, timeout=_RENDER_TIMEOUT)
             wait_end = time.time()
-            print(f"[RenderGaussian] Render result received in {wait_end - wait_start:.3f}s")
-            print(f"[RenderGaussian] Base64 image length: {len(base64_image)}")
         except (TimeoutError, RuntimeError) as e:
-            wait_end = time.time()
-            print(f"[RenderGaussian] ERROR: {e}")
-            print(f"[RenderGaussian] Wait time: {wait_end - wait_start:.3f}s")
-            print(f"[RenderGaussian] Creating placeholder image...")
-            image = self._create_placeholder_image(output_resolution, aspect)
-            total_time = time.time() - start_time
-            print(f"[RenderGaussian] ===== RENDER FAILED =====")
-            print(f"[RenderGaussian] Total time: {total_time:.3f}s")
-            print("=" * 80)
-            return (image,)
-
-        # 5. Convert base64 to tensor
+            logger.error("Render failed after %.3fs: %s", time.time() - start_time, e)
+            return None
+
+        # 5. Convert result (raw bytes or base64) to tensor
         convert_start = time.time()
         try:
-            image_tensor = self._base64_to_tensor(base64_image)
+            image_data = self._decode_base64_bytes(render_result)
+            image_tensor = self._bytes_to_tensor(image_data)
             convert_end = time.time()
-            print(f"[RenderGaussian] Image conversion completed in {convert_end - convert_start:.3f}s")
-            print(f"[RenderGaussian] Result tensor shape: {image_tensor.shape}")
-            print(f"[RenderGaussian] Result tensor dtype: {image_tensor.dtype}")
-            print(f"[RenderGaussian] Result tensor value range: [{image_tensor.min():.4f}, {image_tensor.max():.4f}]")
         except Exception as e:
-            convert_end = time.time()
-            print(f"[RenderGaussian] ERROR: Failed to convert image: {e}")
-            print(f"[RenderGaussian] Conversion time: {convert_end - convert_start:.3f}s")
-            image = self._create_placeholder_image(output_resolution, aspect)
-            total_time = time.time() - start_time
-            print(f"[RenderGaussian] ===== RENDER FAILED (Conversion Error) =====")
-            print(f"[RenderGaussian] Total time: {total_time:.3f}s")
-            print("=" * 80)
-            return (image,)
-
-        # 6. Save output image to file
+            logger.error("Failed to convert rendered image: %s", e)
+            return None
+
+        # 6. Save output image to file (in the background; the tensor doesn't depend on it)
         save_start = time.time()
-        try:
-            output_filename = self._save_output_image(base64_image, ply_path)
-            save_end = time.time()
-            print(f"[RenderGaussian] Output image saved: {output_filename}")
-            print(f"[RenderGaussian] Save time: {save_end - save_start:.3f}s")
-        except Exception as e:
-            save_end = time.time()
-            print(f"[RenderGaussian] WARNING: Failed to save output image: {e}")
-            print(f"[RenderGaussian] Save time: {save_end - save_start:.3f}s")
+        self._submit_output_save(image_data, info)
+        save_end = time.time()
 
         # 7. Return image tensor
-        total_time = time.time() - start_time
-        print(f"[RenderGaussian] ===== RENDER SUCCESS =====")
-        print(f"[RenderGaussian] Total time: {total_time:.3f}s")
-        print(f"[RenderGaussian] Breakdown:")
-        print(f"  - Send request: {send_end - send_start:.3f}s")
-        print(f"  - Wait for result: {wait_end - wait_start:.3f}s")
-        print(f"  - Convert to tensor: {convert_end - convert_start:.3f}s")
-        print(f"  - Save image: {save_end - save_start:.3f}s")
-        print("=" * 80)
-        
-        return (image_tensor,)
+        logger.debug(
+            "request %s done in %.3fs (send %.3fs, wait %.3fs, convert %.3fs, save %.3fs), shape=%s",
+            request_id, time.time() - start_time,
+            send_end - send_start, wait_end - wait_start,
+            convert_end - convert_start, save_end - save_start,
+            tuple(image_tensor.shape),
+        )
+        return image_tensor
 
     def _generate_request_id(self):
         """Generate unique request ID for render operations."""
-        return f"render-{uuid.uuid4().hex[:16]}"
+        return f"render-{_PID:x}-{next(_REQ_COUNTER):x}"
 
-    def _wait_for_render_result(self, request_id, timeout=30):
+    def _wait_for_render_result(self, request_id, timeout=_RENDER_TIMEOUT):
         """
         Wait for render result with timeout.
         
-        Results are stored in class-level dict by JavaScript widget.
+        Results are stored in the module-level result dict by the endpoint
+        handlers, which also set a per-request event so the wait wakes
+        immediately instead of polling.
         """
-        start_time = time.time()
-        print(f"[RenderGaussian] Waiting for render result: request_id={request_id}, timeout={timeout}s")
-        while time.time() - start_time < timeout:
-            self._prune_render_results()
-            if request_id in RenderGaussianNode.render_results:
-                result = RenderGaussianNode.render_results.pop(request_id)
-                RenderGaussianNode.render_results_meta.pop(request_id, None)
-                try:
-                    RenderGaussianNode.render_results_queue.remove(request_id)
-                except ValueError:
-                    pass
-                print(f"[RenderGaussian] Render result found for request_id={request_id}")
-                return result
-            if request_id in RenderGaussianNode.render_errors:
-                error = RenderGaussianNode.render_errors.pop(request_id)
-                RenderGaussianNode.render_errors_meta.pop(request_id, None)
-                try:
-                    RenderGaussianNode.render_errors_queue.remove(request_id)
-                except ValueError:
-                    pass
-                raise RuntimeError(f"Frontend render failed for request {request_id}: {error}")
-            time.sleep(0.1)
-        raise TimeoutError(f"Render timeout for request {request_id}")
+        # Register before the first check so a result stored in between still wakes us
+        with _RENDER_LOCK:
+            event = _RENDER_EVENTS.setdefault(request_id, threading.Event())
+        deadline = time.time() + timeout
+        try:
+            while True:
+                with _RENDER_LOCK:
+                    _prune_render_results_locked()
+                    if request_id in _RENDER_RESULTS:
+                        _RENDER_RESULTS_META.pop(request_id, None)
+                        _remove_queued(_RENDER_RESULTS_QUEUE, request_id)
+                        return _RENDER_RESULTS.pop(request_id)
+                    error = _RENDER_ERRORS.pop(request_id, None)
+                    if error is not None:
+                        _RENDER_ERRORS_META.pop(request_id, None)
+                        _remove_queued(_RENDER_ERRORS_QUEUE, request_id)
+                if error is not None:
+                    raise RuntimeError(f"Frontend render failed for request {request_id}: {error}")
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Render timeout for request {request_id}")
+                event.wait(remaining)
+                event.clear()
+        finally:
+            with _RENDER_LOCK:
+                _RENDER_EVENTS.pop(request_id, None)
 
     @classmethod
-    def _store_render_result(cls, request_id: str, image: str):
+    def _store_render_result(cls, request_id: str, image):
         """Store render result with TTL and size-based eviction."""
-        now = time.time()
-        cls.render_results[request_id] = image
-        cls.render_results_meta[request_id] = now
-        cls.render_results_queue.append(request_id)
-        cls._prune_render_results()
+        with _RENDER_LOCK:
+            _RENDER_RESULTS[request_id] = image
+            _RENDER_RESULTS_META[request_id] = time.time()
+            _RENDER_RESULTS_QUEUE.append(request_id)
+            _prune_render_results_locked()
+            event = _RENDER_EVENTS.get(request_id)
+        if event is not None:
+            event.set()
 
     @classmethod
     def _store_render_error(cls, request_id: str, error: str):
         """Store render error so waiting render calls can fail immediately."""
-        now = time.time()
-        cls.render_errors[request_id] = error
-        cls.render_errors_meta[request_id] = now
-        cls.render_errors_queue.append(request_id)
-        cls._prune_render_results()
-
-    @classmethod
-    def _prune_render_results(cls):
-        """Evict old render results by TTL and max size."""
-        now = time.time()
-        ttl = getattr(cls, "render_results_ttl", 300)
-        max_items = getattr(cls, "render_results_max", 200)
-
-        # TTL eviction
-        expired = [key for key, ts in list(cls.render_results_meta.items()) if now - ts > ttl]
-        for key in expired:
-            cls.render_results.pop(key, None)
-            cls.render_results_meta.pop(key, None)
-            try:
-                cls.render_results_queue.remove(key)
-            except ValueError:
-                pass
-        expired_errors = [key for key, ts in list(cls.render_errors_meta.items()) if now - ts > ttl]
-        for key in expired_errors:
-            cls.render_errors.pop(key, None)
-            cls.render_errors_meta.pop(key, None)
-            try:
-                cls.render_errors_queue.remove(key)
-            except ValueError:
-                pass
-
-        # Size-based eviction (FIFO)
-        while len(cls.render_results_queue) > max_items:
-            oldest = cls.render_results_queue.pop(0)
-            cls.render_results.pop(oldest, None)
-            cls.render_results_meta.pop(oldest, None)
-        while len(cls.render_errors_queue) > max_items:
-            oldest = cls.render_errors_queue.pop(0)
-            cls.render_errors.pop(oldest, None)
-            cls.render_errors_meta.pop(oldest, None)
-
-    def _lookup_camera_state(self, ply_path: str, relative_path: str, filename: str):
+        with _RENDER_LOCK:
+            _RENDER_ERRORS[request_id] = error
+            _RENDER_ERRORS_META[request_id] = time.time()
+            _RENDER_ERRORS_QUEUE.append(request_id)
+            _prune_render_results_locked()
+            event = _RENDER_EVENTS.get(request_id)
+        if event is not None:
+            event.set()
+
+    def _lookup_camera_state(self, info: PlyPathInfo):
         """Lookup cached camera state by possible keys."""
-        for key in (ply_path, relative_path, filename):
-            if key and key in CAMERA_PARAMS_BY_KEY:
-                return CAMERA_PARAMS_BY_KEY.get(key)
-        return None
+        return _lookup_camera_state_by_info(info)
 
     def _get_aspect_ratio(self, intrinsics, camera_state):
         """Derive aspect ratio from camera state or intrinsics."""
         if camera_state:
-            width = camera_state.get("image_width")
-            height = camera_state.get("image_height")
-            if width and height:
+            width = camera_state.get("image_width") or 0
+            height = camera_state.get("image_height") or 0
+            # Frontend sends plain numbers; only odd inputs need float() parsing
+            if not (isinstance(width, (int, float)) and isinstance(height, (int, float))):
                 try:
                     width = float(width)
                     height = float(height)
-                    if width > 0 and height > 0:
-                        return width / height
                 except (TypeError, ValueError):
-                    pass
+                    width = height = 0
+            if width > 0 and height > 0:
+                return width / height
 
-        if intrinsics and len(intrinsics) >= 2:
+        if intrinsics is not None and len(intrinsics) >= 2:
             try:
+                # Principal point is the image center, so cx / cy is the aspect
                 cx = intrinsics[0][2]
                 cy = intrinsics[1][2]
                 if cx > 0 and cy > 0:
-                    return (cx * 2) / (cy * 2)
+                    return float(cx) / float(cy)
             except (TypeError, IndexError):
                 pass
 
@@ -423,30 +576,25 @@ class RenderGaussianNode:
             return int(round(min_dim * aspect))
         return int(round(min_dim / aspect))
 
-    def _send_render_request(self, request_id: str, ui_data: dict, node_id=None):
-        """Send a render request to the frontend via ComfyUI websocket."""
+    def _send_render_request(self, request_id: str, payload: dict, node_id=None):
+        """
+        Send a render request to the frontend via ComfyUI websocket.
+
+        ``payload`` holds the plain request fields; request_id and node_id
+        are added here. PromptServer serializes the dict itself.
+        """
         try:
             from server import PromptServer
         except Exception as e:
-            print(f"[RenderGaussian] PromptServer not available: {e}")
+            logger.warning("PromptServer not available: %s", e)
             return
 
-        payload = {
-            "request_id": request_id,
-            "node_id": node_id,
-            "ply_file": ui_data.get("ply_file", [None])[0],
-            "filename": ui_data.get("filename", [None])[0],
-            "subfolder": ui_data.get("subfolder", [""])[0],
-            "type": ui_data.get("type", ["output"])[0],
-            "output_resolution": ui_data.get("output_resolution", [None])[0],
-            "output_aspect_ratio": ui_data.get("output_aspect_ratio", [None])[0],
-            "extrinsics": ui_data.get("extrinsics", [None])[0],
-            "intrinsics": ui_data.get("intrinsics", [None])[0],
-            "camera_state": ui_data.get("camera_state", [None])[0],
-        }
+        # Sent as a dict: send_sync JSON-encodes the whole {"type", "data"}
+        # message itself and has no pre-serialized text variant (send_bytes is
+        # for binary events), so the payload cannot be cached as bytes here.
+        payload = {"request_id": request_id, "node_id": node_id, **payload}
 
-        print(f"[RenderGaussian] Sending render request with node_id={node_id}, request_id={request_id}")
-        print(f"[RenderGaussian] Render request payload keys: {list(payload.keys())}")
+        logger.debug("Sending render request: node_id=%s request_id=%s", node_id, request_id)
 
         # Try different methods to send the event
         try:
@@ -455,51 +603,157 @@ class RenderGaussianNode:
             elif hasattr(PromptServer.instance, "send"):
                 PromptServer.instance.send("geompack_render_request", payload)
             else:
-                print("[RenderGaussian] PromptServer has no send method")
+                logger.warning("PromptServer has no send method")
                 return
-            print("[RenderGaussian] Render request sent successfully")
         except Exception as e:
-            print(f"[RenderGaussian] Error sending render request: {e}")
+            logger.error("Error sending render request: %s", e)
+
+    def _decode_base64_bytes(self, base64_data):
+        """
+        Decode base64 (optionally data-URL prefixed) image data to encoded image bytes.
+
+        Raw bytes from a multipart upload are already decoded and returned as-is.
+        """
+        if isinstance(base64_data, (bytes, bytearray)):
+            return base64_data
+
+        # Skip a data URL prefix if present; decoding starts past it so the
+        # multi-MB payload is not copied by slicing
+        comma = base64_data.find(",")
+        return _b64_decode_into(base64_data, comma + 1)
+
+    def _bytes_to_tensor(self, image_data):
+        """
+        Decode PNG/JPEG bytes to a (1, H, W, 3) float32 tensor.
+
+        Uses torchvision's native decoder when available, falling back to PIL.
+        """
+        import torch
+
+        pixels = None
+        decoder = _torchvision_decoder()
+        if decoder is not None:
+            decode_image, ImageReadMode = decoder
+            try:
+                if not isinstance(image_data, bytearray):
+                    image_data = bytearray(image_data)
+                encoded = torch.frombuffer(image_data, dtype=torch.uint8)
+                # CHW uint8 -> HWC view
+                pixels = decode_image(encoded, mode=ImageReadMode.RGB).permute(1, 2, 0)
+            except (RuntimeError, ValueError) as e:
+                logger.debug("torchvision decode failed, using PIL: %s", e)
+        if pixels is None:
+            import numpy as np
+            from PIL import Image
+
+            # np.array, not asarray: Pillow's array view is read-only, which
+            # torch.from_numpy warns about. One uint8 copy, no float temporaries.
+            image = Image.open(BytesIO(image_data))
+            pixels = torch.from_numpy(np.array(image.convert("RGB")))
+        return self._pixels_to_tensor(pixels)
+
+    def _pixels_to_tensor(self, pixels):
+        """
+        Scale HxWx3 uint8 pixels into a (1, H, W, 3) float32 tensor in one pass.
+
+        With RENDER_OUTPUT_ON_GPU set and CUDA available, the uint8 pixels are
+        copied to the GPU and normalized there; otherwise the result is on CPU.
+        """
+        import torch
+
+        device = _output_device()
+        if device != "cpu":
+            pixels = pixels.to(device, non_blocking=True)
+        out = torch.empty((1,) + tuple(pixels.shape), dtype=torch.float32, device=pixels.device)
+        torch.div(pixels, 255.0, out=out[0])
+        return out
 
     def _base64_to_tensor(self, base64_data: str):
         """Convert base64 image data to torch tensor."""
-        # Remove data URL prefix if present
-        if "," in base64_data:
-            base64_data = base64_data.split(",")[1]
+        return self._bytes_to_tensor(self._decode_base64_bytes(base64_data))
 
-        image_data = base64.b64decode(base64_data)
-        image = Image.open(BytesIO(image_data)).convert("RGB")
-        image_np = np.array(image).astype(np.float32) / 255.0
-        return torch.from_numpy(image_np).unsqueeze(0)
-
-    def _save_output_image(self, base64_data: str, ply_path: str):
+    def _save_image_bytes(self, image_data, info: PlyPathInfo):
         """
-        Save output image to ComfyUI output directory.
+        Save encoded output image bytes to ComfyUI output directory.
         
-        Filename format: gaussian-{ply_base}-render-{timestamp}.png
+        Filename format: gaussian-{ply_base}-render-{timestamp}.{png,jpg}
+
+        PNG and JPEG payloads from the browser are written verbatim; anything
+        else is re-encoded to PNG with PIL.
         """
         if not COMFYUI_OUTPUT_FOLDER:
             raise RuntimeError("ComfyUI output folder not found")
 
+        if image_data[:8] == _PNG_MAGIC:
+            ext = "png"
+        elif image_data[:3] == _JPEG_MAGIC:
+            ext = "jpg"
+        else:
+            ext = None
+
         # Generate filename
-        base = os.path.splitext(os.path.basename(ply_path))[0]
-        base = base[:50]  # Limit base name length
-        timestamp = uuid.uuid4().hex[:12]
-        filename = f"gaussian-{base}-render-{timestamp}.png"
+        base = info.stem[:50]  # Limit base name length
+        # Random rather than a counter: names must not collide with files from earlier runs
+        timestamp = secrets.token_hex(6)
+        filename = f"gaussian-{base}-render-{timestamp}.{ext or 'png'}"
         filepath = os.path.join(COMFYUI_OUTPUT_FOLDER, filename)
 
-        # Save image
-        if "," in base64_data:
-            base64_data = base64_data.split(",")[1]
+        if ext:
+            with open(filepath, "wb") as f:
+                f.write(image_data)
+        else:
+            from PIL import Image
 
-        image_data = base64.b64decode(base64_data)
-        image = Image.open(BytesIO(image_data))
-        image.save(filepath)
+            image = Image.open(BytesIO(image_data))
+            image.save(filepath)
 
         return filename
 
+    def _submit_output_save(self, image_data, info: PlyPathInfo):
+        """
+        Save the output image on the background pool.
+
+        Falls back to saving inline when _SAVE_PENDING_MAX saves are already
+        queued, so a fast render loop cannot pile up unbounded work.
+        """
+        def save():
+            try:
+                output_filename = self._save_image_bytes(image_data, info)
+                logger.debug("Output image saved: %s", output_filename)
+                return output_filename
+            except Exception as e:
+                logger.warning("Failed to save output image: %s", e)
+                return None
+
+        if not _SAVE_SLOTS.acquire(blocking=False):
+            save()
+            return None
+
+        try:
+            future = _SAVE_POOL.submit(save)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit)
+            _SAVE_SLOTS.release()
+            save()
+            return None
+        future.add_done_callback(lambda _: _SAVE_SLOTS.release())
+        # Kept for debugging
+        RenderGaussianNode.last_save_future = future
+        return future
+
+    def _save_output_image(self, base64_data: str, ply_path: str):
+        """Save base64 output image data to ComfyUI output directory."""
+        return self._save_image_bytes(self._decode_base64_bytes(base64_data), _ply_info(ply_path))
+
     def _create_placeholder_image(self, output_resolution: int, aspect: float):
-        """Create a placeholder image for error cases."""
+        """
+        Create a placeholder image for error cases.
+
+        The returned tensor is on the same device as successful renders so
+        the IMAGE output does not switch devices on failure. CPU placeholders
+        are shared per (height, width) and must not be mutated; GPU ones are
+        copied from them each time rather than cached in VRAM.
+        """
         resolution = max(1, int(output_resolution) if output_resolution else 1024)
         aspect = aspect if aspect and aspect > 0 else 1.0
 
@@ -510,8 +764,11 @@ class RenderGaussianNode:
             height = resolution
             width = max(1, int(round(resolution * aspect)))
 
-        placeholder = np.zeros((height, width, 3), dtype=np.float32)
-        return torch.from_numpy(placeholder).unsqueeze(0)
+        image = _zero_image(height, width)
+        device = _output_device()
+        if device != "cpu":
+            image = image.to(device)
+        return image
 
 
 NODE_CLASS_MAPPINGS = {
@@ -526,13 +783,17 @@ NODE_DISPLAY_NAME_MAPPINGS = {
 def _lookup_camera_state_for_change(ply_path: str):
     if not ply_path:
         return None
-    file_info = get_comfy_output_file_info(ply_path)
-    filename = file_info["filename"]
-    relative_path = file_info["relative_path"]
-    for key in (ply_path, relative_path, filename):
-        if key and key in CAMERA_PARAMS_BY_KEY:
-            return CAMERA_PARAMS_BY_KEY.get(key)
-    return None
+    return _lookup_camera_state_by_info(_ply_info(ply_path))
+
+
+def _lookup_camera_state_by_info(info: PlyPathInfo):
+    # The canonical key (output-relative path) comes first so the common case
+    # is a single dict probe; the others cover states stored by older callers.
+    return (
+        CAMERA_PARAMS_BY_KEY.get(info.rel)
+        or CAMERA_PARAMS_BY_KEY.get(info.base)
+        or CAMERA_PARAMS_BY_KEY.get(info.full)
+    )
 
 # Register a lightweight endpoint to receive render results from frontend.
 try:
@@ -541,15 +802,26 @@ try:
 
     @PromptServer.instance.routes.post("/geompack/render_result")
     async def geompack_render_result(request):
-        data = await request.json()
-        request_id = data.get("request_id")
-        image = data.get("image")
+        request_id = None
+        image = None
+        if request.content_type.startswith("multipart/"):
+            # Binary upload: keep the encoded image as bytes, no base64 round trip
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "request_id":
+                    request_id = await part.text()
+                elif part.name == "image":
+                    image = await part.read()
+        else:
+            data = await request.json()
+            request_id = data.get("request_id")
+            image = data.get("image")
 
         if not request_id or not image:
-            print(f"[RenderGaussian] render_result missing request_id or image: request_id={request_id}, image_present={image is not None}")
+            logger.warning("render_result missing request_id or image: request_id=%s image_present=%s", request_id, image is not None)
             return web.json_response({"status": "error", "reason": "missing request_id or image"}, status=400)
 
-        print(f"[RenderGaussian] render_result received: request_id={request_id}, image_len={len(image)}")
+        logger.debug("render_result received: request_id=%s image_len=%d", request_id, len(image))
         RenderGaussianNode._store_render_result(request_id, image)
         return web.json_response({"status": "ok"})
 
@@ -560,65 +832,32 @@ try:
         error = data.get("error") or "unknown frontend render error"
 
         if not request_id:
-            print(f"[RenderGaussian] render_error missing request_id: error={error}")
+            logger.warning("render_error missing request_id: error=%s", error)
             return web.json_response({"status": "error", "reason": "missing request_id"}, status=400)
 
-        print(f"[RenderGaussian] render_error received: request_id={request_id}, error={error}")
+        logger.warning("render_error received: request_id=%s error=%s", request_id, error)
         RenderGaussianNode._store_render_error(request_id, str(error))
         return web.json_response({"status": "ok"})
 
     @PromptServer.instance.routes.post("/geompack/preview_camera")
     async def geompack_preview_camera(request):
-        print("=" * 80)
-        print("[RenderGaussian] ===== PREVIEW_CAMERA REQUEST RECEIVED =====")
-        print("=" * 80)
-        
         data = await request.json()
-        print(f"[RenderGaussian] Raw request data: {data}")
         
         camera_state = data.get("camera_state")
         ply_file = data.get("ply_file")
         filename = data.get("filename")
-        
-        print(f"[RenderGaussian] Parsed parameters:")
-        print(f"[RenderGaussian]   - ply_file: {ply_file}")
-        print(f"[RenderGaussian]   - filename: {filename}")
-        print(f"[RenderGaussian]   - camera_state present: {camera_state is not None}")
 
         if not camera_state:
-            print(f"[RenderGaussian] ERROR: camera_state is missing!")
+            logger.warning("preview_camera missing camera_state: ply_file=%s filename=%s", ply_file, filename)
             return web.json_response({"status": "error", "reason": "missing camera_state"}, status=400)
-        
-        print(f"[RenderGaussian] Camera state details:")
-        print(f"[RenderGaussian]   - Keys: {list(camera_state.keys())}")
-        if 'position' in camera_state:
-            pos = camera_state['position']
-            print(f"[RenderGaussian]   - Position: x={pos.get('x')}, y={pos.get('y')}, z={pos.get('z')}")
-        if 'target' in camera_state:
-            tgt = camera_state['target']
-            if isinstance(tgt, dict):
-                print(f"[RenderGaussian]   - Target: x={tgt.get('x')}, y={tgt.get('y')}, z={tgt.get('z')}")
-            else:
-                print(f"[RenderGaussian]   - Target: {tgt}")
-        if 'fx' in camera_state or 'fy' in camera_state:
-            print(f"[RenderGaussian]   - Focal length: fx={camera_state.get('fx')}, fy={camera_state.get('fy')}")
-        if 'image_width' in camera_state or 'image_height' in camera_state:
-            print(f"[RenderGaussian]   - Image size: {camera_state.get('image_width')}x{camera_state.get('image_height')}")
-        if 'scale' in camera_state:
-            print(f"[RenderGaussian]   - Scale: {camera_state.get('scale')}")
-        if 'scale_compensation' in camera_state:
-            print(f"[RenderGaussian]   - Scale compensation: {camera_state.get('scale_compensation')}")
 
         # Use the shared set_camera_state function
-        print(f"[RenderGaussian] Saving camera state to cache...")
-        for key in (ply_file, filename):
-            if key:
-                set_camera_state(key, camera_state)
-                print(f"[RenderGaussian] ✓ Camera state saved for key: '{key}'")
+        key = canonical_camera_key(ply_file, filename)
+        if key:
+            set_camera_state(key, camera_state)
+            logger.debug("preview_camera stored camera state for key %r", key)
         
-        print(f"[RenderGaussian] ===== PREVIEW_CAMERA REQUEST COMPLETE =====")
-        print("=" * 80)
         return web.json_response({"status": "ok"})
 
 except Exception as e:
-    print(f"[RenderGaussian] Failed to register render_result endpoint: {e}")
+    logger.warning("Failed to register render_result endpoint: %s", e)
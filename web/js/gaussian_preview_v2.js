@@ -34,6 +34,19 @@ const postJson = (url, payload) => {
     });
 };
 
+// Upload a rendered image to the backend as a binary multipart part so the
+// server never has to buffer and base64-decode a multi-MB JSON string.
+const postRenderResult = async (url, requestId, image) => {
+    const blob = typeof image === "string" ? await (await fetch(image)).blob() : image;
+    const form = new FormData();
+    form.append("request_id", requestId);
+    form.append("image", blob, "render.png");
+    return api.fetchApi(url, {
+        method: "POST",
+        body: form
+    });
+};
+
 console.log("[GeomPack Gaussian v2] Loading extension...");
 
 function ensureGeompackConfirmDialog() {
@@ -547,7 +560,7 @@ app.registerExtension({
                         window.postMessage(payload, "*");
 
                         try {
-                            const response = await postJson("/geompack/render_result", { request_id: payload.request_id, image: payload.image });
+                            const response = await postRenderResult("/geompack/render_result", payload.request_id, payload.image);
                             if (!response.ok) {
                                 console.error("[GeomPack Gaussian v2] Failed to send render result:", response.status);
                             } else {
@@ -34,6 +34,19 @@ const postJson = (url, payload) => {
     });
 };
 
+// Upload a rendered image to the backend as a binary multipart part so the
+// server never has to buffer and base64-decode a multi-MB JSON string.
+const postRenderResult = async (url, requestId, image) => {
+    const blob = typeof image === "string" ? await (await fetch(image)).blob() : image;
+    const form = new FormData();
+    form.append("request_id", requestId);
+    form.append("image", blob, "render.png");
+    return api.fetchApi(url, {
+        method: "POST",
+        body: form
+    });
+};
+
 console.log("[GeomPack Render Gaussian] Loading extension...");
 
 app.registerExtension({
@@ -285,7 +298,7 @@ app.registerExtension({
 
                         // Forward result to backend for IMAGE output
                         try {
-                            const response = await postJson("/geompack/render_result", { request_id, image });
+                            const response = await postRenderResult("/geompack/render_result", request_id, image);
                             if (!response.ok) {
                                 console.error("[GeomPack Render Gaussian] Failed to send render result:", response.status);
                             } else {